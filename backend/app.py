@@ -1,22 +1,45 @@
 # backend/app.py
 from __future__ import annotations
-from typing import Optional, List, Dict
-import os, csv, io, json, re, random
-from io import BytesIO
+from typing import Optional, List, Dict, Iterator
+import os, csv, io, re, random, asyncio, itertools, hashlib, threading, time, multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from backend.db import create_db_and_tables, get_session
 from backend.models import Job, Candidate
-from backend.extraction import pdf_to_text_robust, extract_contacts, guess_name, extract_skills_from_text
-from backend.scoring import score_candidate
-from backend.nlp import normalize_skills, jd_requirements_from_text, extract_education, extract_years_experience
+from backend.pipeline import init_worker, process_cv_bytes
+from backend.scoring import prepare_job
+from backend.nlp import normalize_skills, jd_requirements_from_text
 from sqlmodel import select
 
 # -------------------------- App & CORS --------------------------
-app = FastAPI(title="CV Screening API")
+# orjson (optional) serializes responses several times faster than stdlib json. Newer FastAPI
+# serializes natively and marks ORJSONResponse deprecated (warning on every response): skip it there.
+try:
+    import orjson  # noqa: F401  (needed by ORJSONResponse at render time)
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+    if getattr(DefaultResponse, "__deprecated__", None):
+        DefaultResponse = JSONResponse
+except Exception:
+    DefaultResponse = JSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The CV worker pool lives exactly as long as the app (see "CV worker pool" below)
+    global _cv_pool
+    _cv_pool = _start_cv_pool()
+    try:
+        yield
+    finally:
+        _cv_pool.shutdown(wait=False, cancel_futures=True)
+        _cv_pool = None
+
+app = FastAPI(title="CV Screening API", default_response_class=DefaultResponse, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -62,6 +85,28 @@ def _init_firebase():
 _init_firebase()
 print(f"[auth] FIREBASE_ENABLED={FIREBASE_ENABLED}  AUTH_REQUIRED={AUTH_REQUIRED}")
 
+# Verified-token cache: sha256(token) -> (claims, expires_at). Repeat requests with the same
+# ID token skip the RSA verify / key-set fetch until min(token exp, TTL).
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_MAX = 4096
+_token_cache: Dict[str, tuple] = {}
+_token_cache_lock = threading.Lock()
+
+def _verify_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+    with _token_cache_lock:
+        hit = _token_cache.get(key)
+    if hit and hit[1] > now:
+        return hit[0]
+    claims = fb_auth.verify_id_token(token)
+    expires_at = min(float(claims.get("exp", now)), now + TOKEN_CACHE_TTL)
+    with _token_cache_lock:
+        if len(_token_cache) >= TOKEN_CACHE_MAX:
+            _token_cache.pop(next(iter(_token_cache)))  # evict oldest insert
+        _token_cache[key] = (claims, expires_at)
+    return claims
+
 def get_current_user(authorization: str = Header(None)) -> dict:
     # Strict mode → must verify token
     if AUTH_REQUIRED:
@@ -71,14 +116,14 @@ def get_current_user(authorization: str = Header(None)) -> dict:
             raise HTTPException(status_code=401, detail="Missing Authorization Bearer token")
         token = authorization.split(" ", 1)[1].strip()
         try:
-            return fb_auth.verify_id_token(token)
+            return _verify_token(token)
         except Exception:
             raise HTTPException(status_code=401, detail="Invalid or expired token")
     # Non-strict → try verify, else dev user
     if FIREBASE_ENABLED and authorization and authorization.startswith("Bearer "):
         try:
             token = authorization.split(" ", 1)[1].strip()
-            return fb_auth.verify_id_token(token)
+            return _verify_token(token)
         except Exception:
             pass
     return {"uid": os.getenv("DEV_USER_ID", "dev_user")}
@@ -116,6 +161,27 @@ SKILLS_MASTER: List[str] = [
     # Generic
     "Project Management","Site Supervision",
 ]
+# Immutable snapshot handed to the extractors, so their matcher caches hit by identity
+# (each CV worker compiles the skill matchers once, in init_worker)
+SKILLS_MASTER_TUPLE = tuple(SKILLS_MASTER)
+
+# ------------------------ CV worker pool ------------------------
+# PDF parsing, skill matching and scoring are CPU-bound; fan files out across processes.
+CV_WORKERS = int(os.getenv("CV_WORKERS", "0")) or (os.cpu_count() or 1)
+# OCR inside each worker fans out to tesseract subprocesses; share the cores between workers
+OCR_THREADS = max(1, (os.cpu_count() or 1) // CV_WORKERS)
+_cv_pool: Optional[ProcessPoolExecutor] = None
+
+def _start_cv_pool() -> ProcessPoolExecutor:
+    # Workers start from a clean forkserver (spawn where unavailable), never by forking this
+    # process once uvicorn's event loop and threadpool threads are running
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=CV_WORKERS,
+        mp_context=multiprocessing.get_context(method),
+        initializer=init_worker,
+        initargs=(SKILLS_MASTER_TUPLE, OCR_THREADS),
+    )
 
 # ---------------------- JD parsing helper -----------------------
 def _parse_job_description(jd_text: str) -> tuple[list[str], list[str]]:
@@ -211,17 +277,54 @@ def _make_demo_job(field: Optional[str] = None) -> Dict[str, str]:
     return {"field": key, "title": title, "jd_text": jd}
 
 # ---------------------- Access control helper ----------------------
-def _ensure_job_access(sess, job_id: int, current_user: dict) -> Job:
-    job = sess.get(Job, job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+def _check_job_owner(owner_id: Optional[str], current_user: dict) -> None:
     # Enforce ownership only when auth is required
     if AUTH_REQUIRED:
         uid = (current_user or {}).get("uid")
-        if not uid or job.user_id != uid:
+        if not uid or owner_id != uid:
             raise HTTPException(status_code=403, detail="Forbidden: job does not belong to this user")
+
+def _ensure_job_access(sess, job_id: int, current_user: dict) -> Job:
+    job = sess.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    _check_job_owner(job.user_id, current_user)
     return job
 
+def _job_candidate_rows(sess, job_id: int, current_user: dict, *columns,
+                        order_by: tuple = (), limit: Optional[int] = None, offset: int = 0,
+                        yield_per: Optional[int] = None) -> Iterator[tuple]:
+    """
+    Single query for the job owner + the requested Candidate columns (outer join, so a job
+    without candidates still yields one row). Same 404/403 rules as _ensure_job_access,
+    checked on the first row; the remaining rows are streamed lazily from the cursor.
+    The first requested column must be non-null for real candidates (e.g. candidate_id).
+    `order_by` is a tuple of sort keys (default: candidate_id); end it with a unique key so
+    ties and LIMIT/OFFSET pages are deterministic.
+    """
+    stmt = (
+        select(Job.user_id, *columns)
+        .select_from(Job)
+        .outerjoin(Candidate, Candidate.job_id == Job.job_id)
+        .where(Job.job_id == job_id)
+    )
+    stmt = stmt.order_by(*(order_by or (Candidate.candidate_id,)))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    if offset:
+        stmt = stmt.offset(offset)
+    if yield_per:
+        stmt = stmt.execution_options(yield_per=yield_per)
+    result = iter(sess.exec(stmt))
+    first = next(result, None)
+    if first is None:
+        if offset:  # paged past the last candidate: the job row was skipped too
+            _ensure_job_access(sess, job_id, current_user)
+            return iter(())
+        raise HTTPException(status_code=404, detail="Job not found")
+    _check_job_owner(first[0], current_user)
+    return (row[1:] for row in itertools.chain([first], result) if row[1] is not None)
+
 # ---------------------------- Endpoints --------------------------------
 @app.get("/health")
 def health():
@@ -265,8 +368,8 @@ async def create_job(
     job = Job(
         title=title,
         user_id=user_id,
-        mandatory_skills=json.dumps(mandatory_norm),
-        preferred_skills=json.dumps(preferred_norm),
+        mandatory_skills=mandatory_norm,
+        preferred_skills=preferred_norm,
     )
     with get_session() as sess:
         sess.add(job); sess.commit(); sess.refresh(job)
@@ -286,81 +389,112 @@ async def upload_cv(
     with get_session() as sess:
         job = _ensure_job_access(sess, job_id, current_user)
 
-        created: List[Dict] = []
-        for f in files:
-            content = await f.read()
-            text = pdf_to_text_robust(BytesIO(content))
-            contacts = extract_contacts(text)
-            name = guess_name(text)
-
-            raw_skills = extract_skills_from_text(text, SKILLS_MASTER)
-            skills = normalize_skills(raw_skills)
-
-            cand_edu = extract_education(text)
-            cand_years = extract_years_experience(text)
-
-            score, decision, expl = score_candidate(
-                job,
-                candidate_skills=skills,
-                cand_years=cand_years,
-                req_edu=None,
-                cand_edu=cand_edu,
-                requirements=None,
-            )
-
-            cand = Candidate(
+        if _cv_pool is None:
+            # Lifespan didn't run (e.g. --lifespan off): refuse rather than score CVs in-process
+            raise HTTPException(status_code=503, detail="CV worker pool is not running")
+
+        # Workers only need the job's prepared skill sets (built once here), not the ORM instance
+        process = partial(
+            process_cv_bytes, prepared=prepare_job(job), skills_master=SKILLS_MASTER_TUPLE,
+        )
+        contents = [await f.read() for f in files]
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(_cv_pool, process, content)
+            for content in contents
+        ])
+
+        candidates = [
+            Candidate(
                 job_id=job.job_id,
-                name=name,
-                email=contacts.get("email"),
-                phone=contacts.get("phone"),
-                professional_links=json.dumps(contacts.get("links", [])),
-                extracted_skills=json.dumps(skills),
-                match_score=score,
-                decision=decision,
+                name=res["name"],
+                email=res["email"],
+                phone=res["phone"],
+                professional_links=res["links"],
+                extracted_skills=res["skills"],
+                match_score=res["score"],
+                decision=res["decision"],
             )
-            sess.add(cand); sess.commit(); sess.refresh(cand)
-
-            created.append({
-                "candidate_id": cand.candidate_id,
-                "name": cand.name,
-                "email": cand.email,
-                "skills": skills,
-                "education": cand_edu,
-                "years_experience": cand_years,
-                "score": score,
-                "decision": decision,
-                "explain": expl,
-            })
+            for res in results
+        ]
+        # One batched INSERT + one commit for the whole upload
+        sess.add_all(candidates)
+        sess.flush()  # assigns candidate_ids
+
+        created: List[Dict] = [{
+            "candidate_id": cand.candidate_id,
+            "name": cand.name,
+            "email": cand.email,
+            "skills": res["skills"],
+            "education": res["education"],
+            "years_experience": res["years_experience"],
+            "score": res["score"],
+            "decision": res["decision"],
+            "explain": res["explain"],
+        } for cand, res in zip(candidates, results)]
+        sess.commit()
     return {"created": created}
 
 @app.get("/jobs/{job_id}/candidates")
-def list_candidates(job_id: int, sort: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+def list_candidates(
+    job_id: int,
+    sort: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+    current_user: dict = Depends(get_current_user),
+):
     with get_session() as sess:
-        _ = _ensure_job_access(sess, job_id, current_user)  # ensure ownership in strict mode
-        cands = sess.exec(select(Candidate).where(Candidate.job_id == job_id)).all()
-    out = [{
-        "candidate_id": c.candidate_id, "name": c.name, "email": c.email,
-        "skills": json.loads(c.extracted_skills or "[]"),
-        "score": c.match_score, "decision": c.decision,
-    } for c in cands]
-    if sort == "score_desc":
-        out.sort(key=lambda x: (x["score"] is not None, x["score"]), reverse=True)
-    return out
+        rows = _job_candidate_rows(
+            sess, job_id, current_user,
+            Candidate.candidate_id, Candidate.name, Candidate.email,
+            Candidate.extracted_skills, Candidate.match_score, Candidate.decision,
+            # Ordered, limited and offset in SQL: ix_cand_job_score yields rows by score, and only
+            # equal scores get a small temp sort on candidate_id (upload order, as before)
+            order_by=(Candidate.match_score.desc().nulls_last(), Candidate.candidate_id)
+                     if sort == "score_desc" else (),
+            limit=limit, offset=offset,
+        )
+        return [{
+            "candidate_id": cid, "name": name, "email": email,
+            "skills": skills or [],
+            "score": score, "decision": decision,
+        } for cid, name, email, skills, score, decision in rows]
+
+CSV_CHUNK_ROWS = 500
 
 @app.get("/jobs/{job_id}/export.csv")
 def export_candidates_csv(job_id: int, current_user: dict = Depends(get_current_user)):
-    with get_session() as sess:
-        _ = _ensure_job_access(sess, job_id, current_user)  # ensure ownership in strict mode
-        cands = sess.exec(select(Candidate).where(Candidate.job_id == job_id)).all()
-    buf = io.StringIO(); w = csv.writer(buf)
-    w.writerow(["candidate_id","name","email","phone","score","decision","skills"])
-    for c in cands:
-        w.writerow([c.candidate_id, c.name or "", c.email or "", c.phone or "",
-                    c.match_score if c.match_score is not None else "", c.decision or "",
-                    ", ".join(json.loads(c.extracted_skills or "[]"))])
-    buf.seek(0)
+    # The session stays open while the response streams; row_iter closes it
+    sess = get_session()
+    try:
+        rows = _job_candidate_rows(
+            sess, job_id, current_user,
+            Candidate.candidate_id, Candidate.name, Candidate.email, Candidate.phone,
+            Candidate.match_score, Candidate.decision, Candidate.extracted_skills,
+            yield_per=CSV_CHUNK_ROWS,
+        )
+    except Exception:
+        sess.close()
+        raise
+
+    def row_iter() -> Iterator[str]:
+        try:
+            buf = io.StringIO(); w = csv.writer(buf)
+            w.writerow(["candidate_id","name","email","phone","score","decision","skills"])
+            for i, (cid, name, email, phone, score, decision, skills) in enumerate(rows, 1):
+                w.writerow([cid, name or "", email or "", phone or "",
+                            score if score is not None else "", decision or "",
+                            ", ".join(skills or [])])
+                if i % CSV_CHUNK_ROWS == 0:
+                    yield buf.getvalue()
+                    buf.seek(0); buf.truncate(0)
+            if buf.tell():
+                yield buf.getvalue()
+        finally:
+            sess.close()
+
     return StreamingResponse(
-        iter([buf.getvalue()]),
+        row_iter(),
         media_type="text/csv",
         headers={"Content-Disposition": f'attachment; filename="job_{job_id}_candidates.csv"'}
     )
@@ -1,13 +1,37 @@
 # backend/db.py
 import os
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cv_screening.db")
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+# timeout: wait on a locked database instead of failing immediately
+connect_args = {"check_same_thread": False, "timeout": 30} if IS_SQLITE else {}
+# JSON columns (skill lists) go through orjson when it is installed
+try:
+    import orjson
+    json_kwargs = {"json_serializer": lambda o: orjson.dumps(o).decode(), "json_deserializer": orjson.loads}
+except Exception:
+    json_kwargs = {}
+engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args, **json_kwargs)
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record) -> None:
+        # WAL: readers don't block the writer; NORMAL sync is durable under WAL with far fewer fsyncs
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA mmap_size=268435456")
+        cur.close()
 
 def create_db_and_tables() -> None:
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add any newly declared indexes to them
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 def get_session() -> Session:
     # Used as: with get_session() as sess:
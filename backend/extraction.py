@@ -1,20 +1,31 @@
 # backend/extraction.py
 from __future__ import annotations
 
+import os
 import re
-from io import BytesIO
-from functools import lru_cache
-from typing import Iterable, List, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, lru_cache
+from typing import Deque, Dict, Iterable, Iterator, List, Sequence, Set, Tuple
 
-import pdfplumber
+import fitz  # PyMuPDF
 from rapidfuzz import process, fuzz
 
-# Optional spaCy for noun-chunks (used only if available)
-try:
-    import spacy
-    _NLP = spacy.load("en_core_web_sm")
-except Exception:
-    _NLP = None
+from backend.matching import build_automaton, iter_word_matches
+
+# Optional spaCy for names / phrase matching / noun-chunks (used only if available).
+# Loaded on first use, so only the CV worker processes pay for the model, not the API process.
+@cache
+def _get_nlp():
+    # Lemmas are never read; NER (names) and tagger/attribute_ruler/parser (noun chunks) are.
+    try:
+        import spacy
+        return spacy.load("en_core_web_sm", disable=["lemmatizer"])
+    except Exception:
+        return None
+
+# Noun-chunk parsing cost grows with length; skills show up well within this prefix
+_NLP_MAX_CHARS = 20_000
 
 # ------------------------------ Regexes ---------------------------------
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
@@ -22,6 +33,11 @@ PHONE_RE = re.compile(
     r"(?:\+?\d{1,3}[\s-]?)?(?:\(?\d{2,4}\)?[\s-]?)?\d(?:[\d\s-]{6,}\d)"
 )  # tries to reduce accidental matches
 URL_RE = re.compile(r"https?://[^\s)>\]}]+", re.I)
+# All three in one alternation so extract_contacts walks the text once (m.lastgroup = kind)
+CONTACTS_RE = re.compile(
+    f"(?P<email>{EMAIL_RE.pattern})|(?P<url>{URL_RE.pattern})|(?P<phone>{PHONE_RE.pattern})",
+    re.I,
+)
 
 # Lines to ignore when guessing names
 _NAME_SKIP = re.compile(
@@ -33,59 +49,98 @@ def _char_count(text: str) -> int:
     return sum(ch.isalnum() for ch in text or "")
 
 # ------------------------------ PDF → Text ------------------------------
-def pdf_to_text(pdf_bytes: BytesIO | bytes) -> str:
-    """Primary text extraction via pdfplumber."""
-    buf = BytesIO(pdf_bytes) if isinstance(pdf_bytes, bytes) else pdf_bytes
-    text_pages: List[str] = []
-    with pdfplumber.open(buf) as pdf:
-        for p in pdf.pages:
-            text_pages.append(p.extract_text() or "")
-    return "\n".join(text_pages)
+def _open_pdf(pdf_bytes: bytes) -> "fitz.Document":
+    # PyMuPDF reads straight from the uploaded bytes: no BytesIO wrapper, no extra copy
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
 
-def pdf_to_text_robust(pdf_bytes: BytesIO | bytes, ocr_dpi: int = 200, max_pages: int = 30) -> str:
-    """
-    Try pdfplumber. If too little text (likely scanned), fallback to OCR using PyMuPDF + pytesseract.
-    """
-    base = pdf_to_text(pdf_bytes)
-    if _char_count(base) > 180:
-        return base
+def _doc_text(doc: "fitz.Document") -> str:
+    return "\n".join(p.get_text("text") for p in doc)
 
-    # OCR fallback
-    try:
-        import fitz  # PyMuPDF
-        from PIL import Image
-        import pytesseract
+def pdf_to_text(pdf_bytes: bytes) -> str:
+    """Primary text extraction via the PyMuPDF text layer."""
+    with _open_pdf(pdf_bytes) as doc:
+        return _doc_text(doc)
 
-        if isinstance(pdf_bytes, bytes):
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        else:
-            doc = fitz.open(stream=pdf_bytes.getvalue(), filetype="pdf")
+def _ocr_doc(doc: "fitz.Document", ocr_dpi: int, max_pages: int, threads: int | None = None) -> str:
+    from PIL import Image
+    import pytesseract
 
-        ocr_texts: List[str] = []
-        for i, page in enumerate(doc):
-            if i >= max_pages:
-                break
-            pix = page.get_pixmap(dpi=ocr_dpi, alpha=False)  # no alpha → simpler PIL conversion
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    n_pages = min(doc.page_count, max_pages)
+    if not n_pages:
+        return ""
+    threads = max(1, min(threads or os.cpu_count() or 1, n_pages))
+
+    def render(i: int) -> "Image.Image":
+        pix = doc[i].get_pixmap(dpi=ocr_dpi, alpha=False)  # no alpha → simpler PIL conversion
+        return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+    # PyMuPDF is not thread-safe, so pages are rendered on this thread; each tesseract call is
+    # its own subprocess, so those fan out across threads. Rendering is far faster than OCR, so
+    # at most `threads` rendered pages are kept in flight (~11 MB each at 200 dpi).
+    texts: List[str] = []
+    in_flight: Deque = deque()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for i in range(n_pages):
+            if len(in_flight) >= threads:
+                texts.append(in_flight.popleft().result())
             # If you have a non-English corpus, pass lang="eng+XXX"
-            ocr_texts.append(pytesseract.image_to_string(img))
-        ocr_text = "\n".join(ocr_texts)
-        return ocr_text if _char_count(ocr_text) > _char_count(base) else base
+            in_flight.append(pool.submit(pytesseract.image_to_string, render(i)))
+        texts.extend(f.result() for f in in_flight)
+    return "\n".join(texts)
 
-    except Exception:
-        # If OCR libs unavailable, return whatever we had
-        return base
+def _looks_scanned(doc: "fitz.Document") -> bool:
+    # Header sniff: a short document whose first page has (almost) no text layer
+    first = doc[0].get_text("text") if doc.page_count else ""
+    return doc.page_count < 5 and _char_count(first) < 40
+
+def pdf_to_text_robust(
+    pdf_bytes: bytes, ocr_dpi: int = 200, max_pages: int = 30, ocr_threads: int | None = None,
+) -> str:
+    """
+    Open the PDF once with PyMuPDF and read its text layer. If too little text (likely scanned),
+    rasterize pages from the same document and OCR them with pytesseract. Documents whose first
+    page already looks scanned go straight to OCR without reading the full text layer.
+    `ocr_threads` caps concurrent tesseract calls (default: CPU count).
+    """
+    with _open_pdf(pdf_bytes) as doc:
+        base = None if _looks_scanned(doc) else _doc_text(doc)
+        if base is not None and _char_count(base) > 180:
+            return base
+
+        # OCR fallback
+        try:
+            ocr_text = _ocr_doc(doc, ocr_dpi, max_pages, ocr_threads)
+        except Exception:
+            ocr_text = ""  # OCR libs unavailable
+        if base is None:
+            if _char_count(ocr_text) > 180:
+                return ocr_text
+            base = _doc_text(doc)
+        return ocr_text if _char_count(ocr_text) > _char_count(base) else base
 
 # ------------------------------ Contacts --------------------------------
 def extract_contacts(text: str) -> dict:
-    email = EMAIL_RE.search(text or "")
-    phone = PHONE_RE.search(text or "")
-    urls = URL_RE.findall(text or "")
-    return {
-        "email": email.group(0) if email else None,
-        "phone": phone.group(0) if phone else None,
-        "links": urls,
-    }
+    """
+    First email, first phone and every URL from a single scan. Digits inside an email or URL
+    are consumed by that match, so they are no longer mistaken for a phone number.
+    An email that only appears inside a URL ("...?mail=john@doe.com") is consumed by the URL
+    match too, so when no standalone email is found the text is searched once more for one.
+    """
+    email: str | None = None
+    phone: str | None = None
+    urls: List[str] = []
+    for m in CONTACTS_RE.finditer(text or ""):
+        kind = m.lastgroup
+        if kind == "url":
+            urls.append(m.group(0))
+        elif kind == "email":
+            email = email or m.group(0)
+        else:
+            phone = phone or m.group(0)
+    if email is None and urls:
+        m = EMAIL_RE.search(text)
+        email = m.group(0) if m else None
+    return {"email": email, "phone": phone, "links": urls}
 
 # ------------------------------ Name Guess ------------------------------
 def guess_name(text: str) -> str | None:
@@ -96,9 +151,10 @@ def guess_name(text: str) -> str | None:
         return None
 
     # Try spaCy for PERSON near top of doc
-    if _NLP:
+    nlp = _get_nlp()
+    if nlp:
         head = "\n".join(text.splitlines()[:25])
-        doc = _NLP(head)
+        doc = nlp(head, disable=["parser"])  # entities only
         persons = [ent.text.strip() for ent in doc.ents if ent.label_ == "PERSON" and 3 <= len(ent.text.strip()) <= 60]
         if persons:
             return persons[0]
@@ -121,12 +177,30 @@ def _tokenize_for_ngrams(text_lower: str) -> List[str]:
     # Allow alphanum plus useful tech punctuation
     return re.findall(r"[a-z0-9+#\./-]+", text_lower)
 
-def _generate_ngrams(tokens: List[str], n_min: int = 2, n_max: int = 3) -> List[str]:
-    grams: List[str] = []
-    for n in range(n_min, n_max + 1):
-        for i in range(0, max(0, len(tokens) - n + 1)):
-            grams.append(" ".join(tokens[i:i+n]))
-    return grams
+# Upper bound on fuzzy candidates per CV (keeps rapidfuzz work and memory flat on long texts)
+_MAX_NGRAM_CANDIDATES = 2000
+
+def _generate_ngrams(
+    tokens: List[str], n_min: int = 2, n_max: int = 3, limit: int = _MAX_NGRAM_CANDIDATES
+) -> Iterator[str]:
+    """
+    Stream unique n-grams of 3–50 chars, position by position (so every n is covered for the
+    same text prefix), stopping after `limit`.
+    """
+    seen: Set[str] = set()
+    for i in range(len(tokens)):
+        for n in range(n_min, n_max + 1):
+            if i + n > len(tokens):
+                break
+            gram = " ".join(tokens[i:i+n])
+            if not 3 <= len(gram) <= 50:
+                continue
+            if gram in seen:
+                continue
+            seen.add(gram)
+            yield gram
+            if len(seen) >= limit:
+                return
 
 def _make_skill_pattern(skill: str) -> re.Pattern:
     """
@@ -149,26 +223,96 @@ def _make_skill_pattern(skill: str) -> re.Pattern:
     return re.compile(rf"(?<!\w){skill_escaped}(?!\w)", re.I)
 
 @lru_cache(maxsize=64)
-def _compiled_skill_patterns(skills_master_tuple: Tuple[str, ...]) -> Tuple[Tuple[str, re.Pattern], ...]:
-    return tuple((s, _make_skill_pattern(s)) for s in skills_master_tuple)
+def _compiled_skill_bundle(skills_master_tuple: Tuple[str, ...]) -> Tuple[re.Pattern, Dict[str, str]]:
+    """
+    Fuse every skill pattern into one alternation; each branch is a named group so
+    `m.lastgroup` maps straight back to the canonical skill. Branches are built from the
+    lowercased skills and compiled case-sensitively: callers lowercase the text once.
+    """
+    branches: List[str] = []
+    names: Dict[str, str] = {}
+    # Longer skills first so e.g. "SAP2000" wins over "SAP" at the same position
+    for i, s in sorted(enumerate(skills_master_tuple), key=lambda p: -len(p[1])):
+        if not s.strip():
+            continue
+        name = f"s{i}"
+        branches.append(f"(?P<{name}>{_make_skill_pattern(s.lower()).pattern})")
+        names[name] = s
+    if not branches:
+        return re.compile(r"(?!)"), names  # never matches
+    return re.compile("|".join(branches)), names
+
+def _skill_literals(skill: str) -> List[str]:
+    """Lowercased literals for one skill: single-spaced form plus the joined form ("power bi" / "powerbi")."""
+    words = skill.lower().split()
+    spaced = " ".join(words)
+    return [spaced] if len(words) < 2 else [spaced, "".join(words)]
+
+@lru_cache(maxsize=64)
+def _skill_automaton(skills_master_tuple: Tuple[str, ...]):
+    return build_automaton((lit, s) for s in skills_master_tuple for lit in _skill_literals(s))
+
+# Identity memo in front of the lru_caches: the app passes the same skills tuple for every CV,
+# so repeat calls skip re-tupling and re-hashing the whole master list.
+_LAST_SKILL_MATCHERS: list = [None, None]  # [skills tuple, (automaton, fused bundle)]
+
+def _skill_matchers(skills_master: Sequence[str]) -> tuple:
+    if skills_master is _LAST_SKILL_MATCHERS[0]:
+        return _LAST_SKILL_MATCHERS[1]
+    skills_tuple = tuple(skills_master)
+    automaton = _skill_automaton(skills_tuple)
+    matchers = (automaton, _compiled_skill_bundle(skills_tuple) if automaton is None else None)
+    if isinstance(skills_master, tuple):  # only immutable inputs are safe to key by identity
+        _LAST_SKILL_MATCHERS[:] = [skills_master, matchers]
+    return matchers
+
+def prepare_skill_matchers(skills_master: Sequence[str]) -> None:
+    """
+    Build the exact-match machinery for a fixed skills master up front (call at startup with
+    the same tuple later passed to extract_skills_from_text), so no request pays the compile.
+    """
+    _skill_matchers(skills_master)
+
+def _exact_matches(text: str, skills_master: Sequence[str]) -> List[str]:
+    automaton, bundle = _skill_matchers(skills_master)
+
+    # Fast path: one Aho-Corasick pass over the whole text (pyahocorasick installed)
+    if automaton is not None:
+        # Collapse whitespace runs so multi-word skills still match across spacing/line breaks
+        text_lower = " ".join(text.lower().split())
+        return list(dict.fromkeys(iter_word_matches(automaton, text_lower)))
+
+    # Fallback: a single fused regex; resume one char after each hit so overlapping skills are kept
+    pattern, names = bundle
+    text_lower = text.lower()
+    found: Dict[str, None] = {}
+    m = pattern.search(text_lower)
+    while m:
+        found[names[m.lastgroup]] = None
+        m = pattern.search(text_lower, m.start() + 1)
+    return list(found)
+
+@lru_cache(maxsize=64)
+def _skill_phrase_matcher(skills_master_tuple: Tuple[str, ...]):
+    from spacy.matcher import PhraseMatcher
 
-def _exact_matches(text: str, skills_master: List[str]) -> List[str]:
-    patterns = _compiled_skill_patterns(tuple(skills_master))
-    found = []
-    for s, pat in patterns:
-        if pat.search(text):
-            found.append(s)
-    return found
+    nlp = _get_nlp()
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for s in skills_master_tuple:
+        if s.strip():
+            matcher.add(s, [nlp.make_doc(s)])
+    return matcher
 
 def extract_skills_from_text(
     text: str,
-    skills_master: List[str],
-    scorer_threshold: int = 78,
+    skills_master: Sequence[str],
+    scorer_threshold: int = 88,
     use_spacy_noun_chunks: bool = True
 ) -> List[str]:
     """
     1) Exact regex matches against the skills master (handles multi-word and dotted skills).
-    2) If sparse, fuzzy-match n-grams and (optionally) noun-chunks to recover phrasing variants.
+    2) If none, spaCy PhraseMatcher over the tokenized text (casing/tokenization variants).
+    3) If still none, fuzzy-match n-grams and (optionally) noun-chunks to recover spelling variants.
     Returns a list of canonical skill strings from skills_master.
     """
     if not text:
@@ -179,29 +323,42 @@ def extract_skills_from_text(
     if exact:
         return sorted(exact)
 
-    # 2) Fuzzy recovery path (for phrasing/spelling variants)
+    # 2) Phrase matcher: tokenizer only, no pipeline components
+    nlp = _get_nlp()
+    if nlp:
+        try:
+            matcher = _skill_phrase_matcher(tuple(skills_master))
+            doc = nlp.make_doc(text)
+            phrase_found = {nlp.vocab.strings[match_id] for match_id, _, _ in matcher(doc)}
+            if phrase_found:
+                return sorted(phrase_found)
+        except Exception:
+            pass
+
+    # 3) Fuzzy recovery path (for spelling variants)
     text_lower = (text or "").lower()
     tokens = _tokenize_for_ngrams(text_lower)
-    grams = _generate_ngrams(tokens, 2, 3)
+    grams = list(_generate_ngrams(tokens, 2, 3))
 
     # Optional: add noun chunks (spaCy) into the candidate phrases
-    if use_spacy_noun_chunks and _NLP:
+    if use_spacy_noun_chunks and nlp:
         try:
-            doc = _NLP(text)
+            doc = nlp(text[:_NLP_MAX_CHARS], disable=["ner"])  # noun chunks only
             grams.extend([nc.text.lower().strip() for nc in doc.noun_chunks])
         except Exception:
             pass
 
-    # Keep unique candidates, but avoid exploding size
-    candidates = list({g for g in grams if 3 <= len(g) <= 50})
+    # Keep unique candidates (n-grams are already unique and capped)
+    candidates = list(dict.fromkeys(g for g in grams if 3 <= len(g) <= 50))
     if not candidates:
         candidates = tokens  # fallback to single tokens
 
-    # RapidFuzz: choose best matches from skills_master for the candidate phrases
-    # Reverse index: find which skills in the master are hit by any candidate
-    hits = process.extract(
-        candidates, skills_master, scorer=fuzz.QRatio, score_cutoff=scorer_threshold, limit=500
-    )
-
-    fuzzy_found = {skill for (skill, score, idx) in hits if isinstance(skill, str)}
+    # RapidFuzz reverse index: per master skill, one C-level scan over all candidate phrases
+    # (candidates are already lowercased, so compare against the lowercased skill)
+    fuzzy_found = {
+        skill for skill in skills_master
+        if skill.strip() and process.extractOne(
+            skill.lower(), candidates, scorer=fuzz.QRatio, score_cutoff=scorer_threshold
+        )
+    }
     return sorted(fuzzy_found)
@@ -0,0 +1,78 @@
+# backend/matching.py
+from __future__ import annotations
+
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Optional pyahocorasick for single-pass multi-literal scans (callers keep a regex fallback)
+try:
+    import ahocorasick
+except Exception:
+    ahocorasick = None
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+def build_automaton(entries: Iterable[Tuple[str, str]]) -> Optional["ahocorasick.Automaton"]:
+    """
+    Build an Aho-Corasick automaton from (lowercased literal, value) pairs.
+    Returns None when pyahocorasick is not installed or there is nothing to match.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for literal, value in entries:
+        if literal:
+            automaton.add_word(literal, (len(literal), value))
+    if len(automaton) == 0:
+        return None
+    automaton.make_automaton()
+    return automaton
+
+def iter_word_spans(automaton: "ahocorasick.Automaton", text_lower: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    One linear pass over `text_lower`, yielding (start, end, value) for every literal hit that is
+    not glued to a neighbouring word character (same effect as wrapping it in \\b / (?<!\\w)(?!\\w)).
+    `end` is exclusive. Overlapping hits are all reported.
+    """
+    n = len(text_lower)
+    for last, (length, value) in automaton.iter(text_lower):
+        start, end = last - length + 1, last + 1
+        if start > 0 and _is_word_char(text_lower[start - 1]):
+            continue
+        if end < n and _is_word_char(text_lower[end]):
+            continue
+        yield start, end, value
+
+def iter_word_matches(automaton: "ahocorasick.Automaton", text_lower: str) -> Iterator[str]:
+    """Values of every word-bounded hit (overlapping hits included), see `iter_word_spans`."""
+    for _, _, value in iter_word_spans(automaton, text_lower):
+        yield value
+
+def maximal_word_matches(automaton: "ahocorasick.Automaton", text_lower: str) -> List[str]:
+    """
+    Values of the word-bounded hits that don't sit inside a longer accepted hit, in text order
+    (e.g. "node js" yields only the "node js" value, not also the one for "js").
+    """
+    spans = sorted(iter_word_spans(automaton, text_lower), key=lambda sp: (sp[0], -sp[1]))
+    out: List[str] = []
+    covered_to = -1
+    for start, end, value in spans:
+        if end <= covered_to:
+            continue  # nested in an earlier, longer hit
+        covered_to = end
+        out.append(value)
+    return out
+
+def contains_word(text_lower: str, word: str) -> bool:
+    """
+    `word` occurs in `text_lower` with no word character glued to either side; plain
+    str.find per hit, for callers scanning a handful of literals without an automaton.
+    """
+    n, k = len(text_lower), len(word)
+    i = text_lower.find(word)
+    while i != -1:
+        j = i + k
+        if (i == 0 or not _is_word_char(text_lower[i - 1])) and (j == n or not _is_word_char(text_lower[j])):
+            return True
+        i = text_lower.find(word, i + 1)
+    return False
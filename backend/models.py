@@ -1,25 +1,28 @@
 # backend/models.py
 from sqlmodel import SQLModel, Field
-from typing import Optional
+from sqlalchemy import Column, Index, JSON
+from typing import List, Optional
 from datetime import datetime
-import json
 
 class Job(SQLModel, table=True):
     job_id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[str] = Field(default="default_user", index=True)
     title: str
-    mandatory_skills: str  # JSON encoded list
-    preferred_skills: str  # JSON encoded list
+    mandatory_skills: List[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    preferred_skills: List[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Candidate(SQLModel, table=True):
+    # Serves both `WHERE job_id = ?` (leftmost prefix) and per-job ordering by score
+    __table_args__ = (Index("ix_cand_job_score", "job_id", "match_score"),)
+
     candidate_id: Optional[int] = Field(default=None, primary_key=True)
     job_id: int = Field(foreign_key="job.job_id")
     name: Optional[str]
     email: Optional[str]
     phone: Optional[str]
-    professional_links: Optional[str]  # JSON string list
-    extracted_skills: str  # JSON encoded list
+    professional_links: Optional[List[str]] = Field(default=None, sa_column=Column(JSON))
+    extracted_skills: List[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
     match_score: float = 0.0
     decision: str = "Pending"
     submitted_at: datetime = Field(default_factory=datetime.utcnow)
@@ -2,14 +2,11 @@
 from __future__ import annotations
 
 import re
-from typing import List, Dict, Optional
+import sys
+from functools import lru_cache
+from typing import Iterable, List, Dict, Optional, Tuple
 
-# ------------------------- Optional spaCy loading -------------------------
-try:
-    import spacy
-    nlp = spacy.load("en_core_web_sm")
-except Exception:
-    nlp = None  # graceful fallback when spaCy/model is not present
+from backend.matching import build_automaton, contains_word, iter_word_matches, maximal_word_matches
 
 # ------------------------- Skill Synonyms / Canonicals -------------------
 # Map lowercased variants -> Canonical skill names (case-sensitive targets)
@@ -92,17 +89,56 @@ _PRESERVE_CASE = {
     "AWS", "GCP", "CI/CD", "SQL", "CAD", "PLC", "RN", "ICU",
 }
 
+def _fused_alternation(entries: Iterable[Tuple[str, str]]) -> Tuple[re.Pattern, Dict[str, str]]:
+    """
+    One case-insensitive alternation over (pattern, value) pairs, longest pattern first so the
+    longer variant wins at a shared position. Each branch is a named group: `m.lastgroup` -> value.
+    """
+    branches: List[str] = []
+    names: Dict[str, str] = {}
+    for i, (pat, value) in enumerate(sorted(entries, key=lambda e: -len(e[0]))):
+        name = f"g{i}"
+        branches.append(f"(?P<{name}>{pat})")
+        names[name] = value
+    return re.compile("|".join(branches), re.I), names
+
+_ALIAS_PAIRS: List[Tuple[str, str]] = [
+    *_SKILL_ALIASES.items(), *((c.lower(), c) for c in sorted(set(_SKILL_ALIASES.values())))
+]
+# Single-pass scan for alias keys and canonical names in free text (None without pyahocorasick)
+_alias_automaton = build_automaton(_ALIAS_PAIRS)
+# Regex fallback: same literals, one linear pass (non-overlapping, longest variant first)
+_ALIAS_RE, _alias_names = _fused_alternation(
+    (r"(?<!\w)" + re.escape(k) + r"(?!\w)", v) for k, v in _ALIAS_PAIRS
+)
+
+# Title-cased forms -> canonical brand spelling, applied after title-casing in normalize_skill
+_FINAL_POLISH: Dict[str, str] = {
+    "Javascript": "JavaScript",
+    "Power Bi": "Power BI",
+    "Ms Excel": "Excel",
+    "Autocad": "AutoCAD",
+    "Sap2000": "SAP2000",
+}
+_FINAL_POLISH_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, _FINAL_POLISH)) + r")\b")
+
+# en/em dash -> ASCII hyphen, applied in one C-level pass
+_DASH_TABLE = str.maketrans({"–": "-", "—": "-"})
+
 def _clean(s: str) -> str:
-    s = (s or "").strip()
-    # normalize common dashes and spacing
-    s = s.replace("–", "-").replace("—", "-")
-    s = re.sub(r"\s+", " ", s)
-    return s
+    # normalize common dashes and spacing (split() also strips and collapses whitespace runs)
+    return " ".join(s.translate(_DASH_TABLE).split()) if s else ""
 
+@lru_cache(maxsize=8192)
 def normalize_skill(s: str) -> str:
     """
     Canonicalize a single skill string using aliases and light casing rules.
+    Pure and memoized: the same skill strings recur across every CV and JD.
+    Results are interned, so every copy of "Python" is the same object.
     """
+    return sys.intern(_canonical_skill(s))
+
+def _canonical_skill(s: str) -> str:
     if not s:
         return ""
     raw = _clean(s)
@@ -123,29 +159,24 @@ def normalize_skill(s: str) -> str:
     # Default to title case, but keep inner punctuation as-is
     # e.g., "project management", "adobe premiere pro"
     # Preserve casing for known dotted/brand tokens
-    tokens = [t for t in re.split(r"(\s+)", raw)]  # keep whitespace
+    # `_clean` already collapsed whitespace to single spaces, so split/join round-trips it
     out = []
-    for t in tokens:
-        if not t.strip():
-            out.append(t)
-            continue
+    for t in raw.split(" "):
         if t.lower() in {"node.js", "nodejs", "ci/cd"}:
             out.append(_SKILL_ALIASES.get(t.lower(), t))
-        elif re.fullmatch(r"[A-Za-z]+", t):
+        elif t.isascii() and t.isalpha():
             out.append(t.capitalize())
         else:
             # Mixed tokens like "PowerPoint", "SAP2000", "AutoCAD"
             # If it's alnum+punct, lightly title-case alphabetic parts
             out.append(t if any(ch.isupper() for ch in t) else t.title())
-    cand = "".join(out).strip()
+    cand = " ".join(out)
 
-    # Final polish for known canonical brands
-    cand = re.sub(r"\bJavascript\b", "JavaScript", cand)
-    cand = re.sub(r"\bPower Bi\b", "Power BI", cand)
-    cand = re.sub(r"\bMs Excel\b", "Excel", cand)
-    cand = re.sub(r"\bAutocad\b", "AutoCAD", cand)
-    cand = re.sub(r"\bSap2000\b", "SAP2000", cand)
-    return cand
+    # Final polish for known canonical brands: whole-skill lookup, else one pass for embedded forms
+    polished = _FINAL_POLISH.get(cand)
+    if polished is not None:
+        return polished
+    return _FINAL_POLISH_RE.sub(lambda m: _FINAL_POLISH[m.group(0)], cand)
 
 def normalize_skills(skills: List[str]) -> List[str]:
     """
@@ -168,20 +199,12 @@ def normalize_skills(skills: List[str]) -> List[str]:
 # - "3-5 years", "3 – 5 years", "3 to 5 years"
 # - "5+ years", "5 yrs+", "at least 4 years", "minimum 4 years"
 # - "7 years experience", "7 yrs exp"
-_RANGE_PAT = re.compile(
-    r"\b(?P<a>\d{1,2})\s*(?:-|–|—|to)\s*(?P<b>\d{1,2})\s*(?:\+?\s*)?(?:years?|yrs?)\b",
-    re.I,
-)
-_MIN_PAT = re.compile(
-    r"\b(?:min(?:imum)?|at\s+least)\s*(?P<n>\d{1,2})\s*(?:\+?\s*)?(?:years?|yrs?)\b",
-    re.I,
-)
-_PLUS_PAT = re.compile(
-    r"\b(?P<n>\d{1,2})\s*\+\s*(?:years?|yrs?)\b",
-    re.I,
-)
-_SIMPLE_PAT = re.compile(
-    r"\b(?P<n>\d{1,2})\s*(?:years?|yrs?)\s*(?:of\s+)?(?:experience|exp)?\b",
+# One alternation scanned once; alternatives are tried in priority order at each position
+_YEARS_PAT = re.compile(
+    r"\b(?P<a>\d{1,2})\s*(?:-|–|—|to)\s*(?P<b>\d{1,2})\s*(?:\+?\s*)?(?:years?|yrs?)\b"
+    r"|\b(?:min(?:imum)?|at\s+least)\s*(?P<min>\d{1,2})\s*(?:\+?\s*)?(?:years?|yrs?)\b"
+    r"|\b(?P<plus>\d{1,2})\s*\+\s*(?:years?|yrs?)\b"
+    r"|\b(?P<simple>\d{1,2})\s*(?:years?|yrs?)\s*(?:of\s+)?(?:experience|exp)?\b",
     re.I,
 )
 
@@ -190,40 +213,19 @@ def extract_years_experience(text: str) -> Optional[int]:
         return None
     t = " " + text + " "  # padding to help regex word boundaries
 
-    # Ranges: take the upper bound (more conservative for capability)
-    m = _RANGE_PAT.search(t)
-    if m:
-        try:
-            a = int(m.group("a"))
-            b = int(m.group("b"))
-            return max(a, b)
-        except Exception:
-            pass
-
-    # "minimum 4 years" / "at least 4 years"
-    m = _MIN_PAT.search(t)
-    if m:
-        try:
-            return int(m.group("n"))
-        except Exception:
-            pass
-
-    # "5+ years"
-    m = _PLUS_PAT.search(t)
-    if m:
-        try:
-            return int(m.group("n"))
-        except Exception:
-            pass
-
-    # "7 years (experience/exp)" or just "7 years"
-    m = _SIMPLE_PAT.search(t)
-    if m:
-        try:
-            return int(m.group("n"))
-        except Exception:
-            pass
-
+    # Priority: range (upper bound, more conservative for capability) > minimum/at least > "5+" > plain "7 years"
+    best: Dict[str, int] = {}
+    for m in _YEARS_PAT.finditer(t):
+        if m.group("a") is not None:
+            return max(int(m.group("a")), int(m.group("b")))
+        for kind in ("min", "plus", "simple"):
+            n = m.group(kind)
+            if n is not None:
+                best.setdefault(kind, int(n))
+                break
+    for kind in ("min", "plus", "simple"):
+        if kind in best:
+            return best[kind]
     return None
 
 # ------------------------------ Education --------------------------------
@@ -244,16 +246,23 @@ _DEGREE_CANON: Dict[str, List[str]] = {
     "RN": ["registered nurse", r"\brn\b"],
 }
 
-# Pre-compile a finder regex for all variants
-_deg_patterns: List[re.Pattern] = []
+# Canonical order of labels, so results don't depend on where in the text they appear
+_DEGREE_ORDER: Dict[str, int] = {canon: i for i, canon in enumerate(_DEGREE_CANON)}
+
+# Plain variants are literals: lowercased variant -> canonical label
+_DEG_LITERALS: Dict[str, str] = {}
+# Entries that are real regexes (contain \b) stay out of the literal scans
+_deg_residual: List[Tuple[str, re.Pattern]] = []
 for canon, variants in _DEGREE_CANON.items():
     for v in variants:
-        # treat entries with \b literally as regex; else escape and word-boundary wrap
+        # treat entries with \b literally as regex; everything else is matched as a whole word
         if r"\b" in v:
-            pat = re.compile(v, re.I)
+            _deg_residual.append((canon, re.compile(v, re.I)))
         else:
-            pat = re.compile(r"\b" + re.escape(v) + r"\b", re.I)
-        _deg_patterns.append((canon, pat))
+            _DEG_LITERALS[v.lower()] = canon
+
+# Single-pass literal scan over all plain variants (None without pyahocorasick)
+_deg_automaton = build_automaton(_DEG_LITERALS.items())
 
 def extract_education(text: str) -> List[str]:
     """
@@ -261,14 +270,19 @@ def extract_education(text: str) -> List[str]:
     """
     if not text:
         return []
-    found = []
-    seen = set()
-    for canon, pat in _deg_patterns:
-        if pat.search(text):
-            if canon not in seen:
+    low = text.lower()
+    if _deg_automaton is not None:
+        seen = set(iter_word_matches(_deg_automaton, low))
+    else:
+        # Plain substring search (C-level) per literal, then a boundary check on each hit
+        seen = set()
+        for variant, canon in _DEG_LITERALS.items():
+            if canon not in seen and contains_word(low, variant):
                 seen.add(canon)
-                found.append(canon)
-    return found
+    for canon, pat in _deg_residual:
+        if canon not in seen and pat.search(text):
+            seen.add(canon)
+    return sorted(seen, key=_DEGREE_ORDER.__getitem__)
 
 # ------------------------------ Job Titles --------------------------------
 _TITLE_WORDS = [
@@ -277,6 +291,9 @@ _TITLE_WORDS = [
     "designer", "teacher", "nurse", "pharmacist", "coordinator",
 ]
 
+# One scan per line; substring semantics on purpose ("Engineering", "Leadership" count too)
+_TITLES_RE = re.compile("|".join(map(re.escape, _TITLE_WORDS)), re.I)
+
 def extract_job_titles(text: str) -> List[str]:
     """
     Very naive: collect lines that contain a known title word.
@@ -284,28 +301,10 @@ def extract_job_titles(text: str) -> List[str]:
     titles = set()
     for line in (text or "").splitlines():
         l = line.strip()
-        if not l:
-            continue
-        low = l.lower()
-        if any(w in low for w in _TITLE_WORDS) and 3 <= len(l) <= 80:
+        if 3 <= len(l) <= 80 and _TITLES_RE.search(l):
             titles.add(l)
     return list(titles)
 
-# ------------------------------ Noun Chunks --------------------------------
-def spacy_chunks(text: str) -> List[str]:
-    """
-    Return SpaCy noun chunks if spaCy is available; otherwise empty list.
-    """
-    if not nlp or not text:
-        return []
-    doc = nlp(text)
-    chunks = []
-    for nc in doc.noun_chunks:
-        s = nc.text.strip()
-        if 2 <= len(s) <= 40 and any(ch.isalpha() for ch in s):
-            chunks.append(s)
-    return chunks
-
 # ------------------------------ JD Requirements ----------------------------
 def jd_requirements_from_text(
     jd_text: str,
@@ -314,7 +313,7 @@ def jd_requirements_from_text(
 ) -> Dict:
     """
     Extract structured requirements from JD:
-      - required skills (fallback lists + noun chunks if available)
+      - required skills (fallback lists + known skill aliases)
       - required education (regex)
       - minimum years of experience (regex)
     """
@@ -322,10 +321,20 @@ def jd_requirements_from_text(
     req_edu = extract_education(jd_text)
     req_years = extract_years_experience(jd_text)
 
-    # Expand skills from noun chunks (when spaCy is available), then normalize
-    chunk_skills = spacy_chunks(jd_text) if nlp else []
-    # Merge fallbacks + chunks, small cap & dedupe, then normalize
-    all_required = normalize_skills(list({*(fallback_mandatory or []), *chunk_skills}))
+    # Expand skills from known aliases in one linear scan (automaton, else fused regex).
+    # Only the longest hit counts, so "node js" doesn't also yield the alias "js".
+    if _alias_automaton is not None:
+        alias_skills = maximal_word_matches(_alias_automaton, jd_text.lower())
+    else:
+        alias_skills = [_alias_names[m.lastgroup] for m in _ALIAS_RE.finditer(jd_text)]
+    # Fallbacks are normalized; alias hits are already canonical ("SAP" must not become "Sap")
+    all_required = normalize_skills(fallback_mandatory or [])
+    seen = {s.lower() for s in all_required}
+    for skill in alias_skills:
+        key = skill.lower()
+        if key not in seen:
+            seen.add(key)
+            all_required.append(skill)
     all_preferred = normalize_skills(list({*(fallback_preferred or [])}))
 
     # Keep tidy
@@ -0,0 +1,75 @@
+# backend/pipeline.py
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence, Tuple
+
+from backend.extraction import (
+    pdf_to_text_robust, extract_contacts, guess_name, extract_skills_from_text, prepare_skill_matchers,
+)
+from backend.scoring import score_candidate
+from backend.nlp import normalize_skills, extract_education, extract_years_experience
+
+# ------------------------------ Worker state ---------------------------------
+# Pinned once per worker process by init_worker (None until then: never score against no skills)
+_SKILLS_MASTER: Optional[Tuple[str, ...]] = None
+# Tesseract threads per worker, so N worker processes don't each start cpu_count OCR jobs
+_OCR_THREADS: Optional[int] = None
+
+def init_worker(skills_master: Sequence[str], ocr_threads: Optional[int] = None) -> None:
+    """ProcessPoolExecutor initializer."""
+    global _SKILLS_MASTER, _OCR_THREADS
+    _SKILLS_MASTER = tuple(skills_master)
+    _OCR_THREADS = ocr_threads
+    prepare_skill_matchers(_SKILLS_MASTER)  # compiled once per worker, reused for every CV
+
+# ------------------------------ Per-CV pipeline ------------------------------
+def process_cv_bytes(
+    content: bytes,
+    prepared: Dict,
+    skills_master: Optional[Sequence[str]] = None,
+) -> Dict:
+    """
+    PDF bytes → text → contacts / name / skills / education / experience → score.
+    Runs inside worker processes, so it only takes and returns picklable values:
+    `prepared` is `prepare_job(job)`, built once per upload.
+    `skills_master` defaults to the tuple pinned by `init_worker`.
+    """
+    if prepared is None:
+        raise ValueError("process_cv_bytes needs prepared=prepare_job(job)")
+    if skills_master is None:
+        skills_master = _SKILLS_MASTER
+    if not skills_master:
+        raise RuntimeError("no skills master: pass skills_master or run init_worker first")
+
+    text = pdf_to_text_robust(content, ocr_threads=_OCR_THREADS)
+    contacts = extract_contacts(text)
+    name = guess_name(text)
+
+    raw_skills = extract_skills_from_text(text, skills_master)
+    skills = normalize_skills(raw_skills)
+
+    cand_edu = extract_education(text)
+    cand_years = extract_years_experience(text)
+
+    score, decision, expl = score_candidate(
+        None,
+        candidate_skills=skills,
+        cand_years=cand_years,
+        req_edu=None,
+        cand_edu=cand_edu,
+        requirements=None,
+        prepared=prepared,
+    )
+
+    return {
+        "name": name,
+        "email": contacts.get("email"),
+        "phone": contacts.get("phone"),
+        "links": contacts.get("links", []),
+        "skills": skills,
+        "education": cand_edu,
+        "years_experience": cand_years,
+        "score": score,
+        "decision": decision,
+        "explain": expl,
+    }
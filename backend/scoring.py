@@ -1,6 +1,7 @@
 # backend/scoring.py
 import json
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple, Optional
 
 def _pct(n: int, d: int) -> float:
     return 0.0 if not d else round(100.0 * n / d, 2)
@@ -8,6 +9,68 @@ def _pct(n: int, d: int) -> float:
 def _clamp(x: float, lo: float = 0.0, hi: float = 100.0) -> float:
     return max(lo, min(hi, x))
 
+@lru_cache(maxsize=1024)
+def _decode_skills(value: str) -> Tuple[str, ...]:
+    # Same job JSON is scored against many candidates: parse each distinct string once
+    return tuple(json.loads(value or "[]"))
+
+def _skill_list(value) -> List[str]:
+    # Job rows decode to lists; JSON-encoded strings are still accepted from older callers
+    if isinstance(value, str):
+        return list(_decode_skills(value))
+    return list(value or [])
+
+# --- Rule bands: (matched_count, matched required) -> base score for counts 0–2 ---
+_BAND_TABLE: Dict[Tuple[int, int], float] = {
+    (0, 0): 0.0,                  # nothing matched → Reject
+    (1, 0): 35.0, (1, 1): 35.0,   # still Reject by requirement
+    (2, 0): 60.0, (2, 1): 65.0, (2, 2): 70.0,  # 60–70: favor required matches within the band
+}
+
+def _band3(n_req: int, n_pref: int) -> float:
+    # 75–85: bias by how many are required
+    return min(75.0 + min(10.0, 3.0 * n_req + 2.0 * n_pref), 85.0)
+
+def _band4plus(matched_count: int, n_req: int) -> float:
+    # 90–100: ramp a little with extra matches (4→90, 5→92.5, 6→95, 7→97.5, 8+→100),
+    # plus a tiny push (up to +2) if most of them are required
+    return 90.0 + min(10.0, (matched_count - 4) * 2.5) + 2.0 * (n_req / matched_count)
+
+def prepare_job(job, requirements: Optional[Dict] = None) -> Dict:
+    """
+    Job-side inputs shared by every candidate, computed once per job:
+      mand_orig / mand_lower (tuples), req / pref (lowercased frozensets),
+      req_edu_lower (lowercased frozenset, or None when requirements carry no
+      required_education and the per-call `req_edu` applies), total_declared,
+      min_years and the resolved requirements dict.
+    Pass it to `score_candidate(..., prepared=...)` when scoring many CVs for one job.
+    """
+    # --- Determine the job skill sets (from requirements if present else from job) ---
+    mandatory = _skill_list(job.mandatory_skills)
+    preferred = _skill_list(job.preferred_skills)
+
+    req = requirements or {}
+    req_skills_list  = req.get("required_skills",  [])
+    pref_skills_list = req.get("preferred_skills", []) or preferred
+
+    # Mandatory skills are lowercased once and reused when they double as the required set.
+    mand_lower = [m.lower() for m in mandatory]
+    req_skills  = frozenset({s.lower() for s in req_skills_list} if req_skills_list else mand_lower)
+    pref_skills = frozenset({s.lower() for s in pref_skills_list})
+    return {
+        "mand_orig": tuple(mandatory),
+        "mand_lower": tuple(mand_lower),
+        "req": req_skills,
+        "pref": pref_skills,
+        "total_declared": len(req_skills | pref_skills) or 1,  # avoid div by zero
+        "min_years": req.get("min_years_experience", None),
+        "req_edu_lower": (
+            frozenset(e.lower() for e in req["required_education"] or ())
+            if "required_education" in req else None
+        ),
+        "requirements": req,
+    }
+
 def score_candidate(
     job,
     candidate_skills: List[str],
@@ -18,6 +81,7 @@ def score_candidate(
     accept_threshold: float = 60.0,          # works with the 2-skill band below
     enforce_mandatory_gate: bool = False,    # set True to hard-reject low mandatory coverage
     mandatory_min_coverage: float = 0.5,     # only used if enforce_mandatory_gate=True
+    prepared: Optional[Dict] = None,         # from prepare_job(); skips rebuilding the job sets
 ) -> Tuple[float, str, Dict]:
     """
     Returns (score, decision, explanation_dict).
@@ -32,23 +96,62 @@ def score_candidate(
     Education/experience add small bonuses/penalties so the score still reflects
     more than just count, but stays within the band you expect for the web UI.
     """
+    return _score_against(
+        prepared if prepared is not None else prepare_job(job, requirements),
+        candidate_skills,
+        cand_years=cand_years,
+        req_edu=req_edu,
+        cand_edu=cand_edu,
+        accept_threshold=accept_threshold,
+        enforce_mandatory_gate=enforce_mandatory_gate,
+        mandatory_min_coverage=mandatory_min_coverage,
+    )
 
-    # --- Determine the job skill sets (from requirements if present else from job) ---
-    mandatory = json.loads(job.mandatory_skills or "[]")
-    preferred = json.loads(job.preferred_skills or "[]")
-
-    req = requirements or {}
-    req_skills_list  = req.get("required_skills",  []) or mandatory
-    pref_skills_list = req.get("preferred_skills", []) or preferred
-
-    req_skills  = set(s.lower() for s in req_skills_list)
-    pref_skills = set(s.lower() for s in pref_skills_list)
-    cand_set    = set(s.lower() for s in (candidate_skills or []))
+def score_candidates_batch(
+    job,
+    candidates: Iterable[Dict],
+    requirements: Optional[Dict] = None,
+    **kwargs,
+) -> List[Tuple[float, str, Dict]]:
+    """
+    Score many candidates against one job; the job-side skill sets are prepared once.
+    Each candidate is a dict with "skills" and optional "years_experience" / "education"
+    (the shape `process_cv_bytes` returns). Extra kwargs are passed as in `score_candidate`.
+    """
+    prepared = prepare_job(job, requirements)
+    return [
+        _score_against(
+            prepared,
+            c.get("skills") or [],
+            cand_years=c.get("years_experience"),
+            cand_edu=c.get("education"),
+            **kwargs,
+        )
+        for c in candidates
+    ]
+
+def _score_against(
+    prepared: Dict,
+    candidate_skills: List[str],
+    cand_years: Optional[int] = None,
+    req_edu: Optional[List[str]] = None,
+    cand_edu: Optional[List[str]] = None,
+    accept_threshold: float = 60.0,
+    enforce_mandatory_gate: bool = False,
+    mandatory_min_coverage: float = 0.5,
+) -> Tuple[float, str, Dict]:
+    """Per-candidate half of `score_candidate` (bands documented there)."""
+    mandatory   = prepared["mand_orig"]
+    req         = prepared["requirements"]
+    req_skills  = prepared["req"]
+    pref_skills = prepared["pref"]
+    cand_set    = {s.lower() for s in (candidate_skills or [])}
 
     # --- Optional HARD GATE on mandatory coverage (off by default) ---
     mandatory_cov_pct = 100.0
     if mandatory:
-        matched_mand = sum(1 for m in mandatory if m.lower() in cand_set)
+        mand_matched_mask = [m in cand_set for m in prepared["mand_lower"]]
+        matched_mand = sum(mand_matched_mask)
         mandatory_cov_pct = _pct(matched_mand, len(mandatory))
         if enforce_mandatory_gate:
             if (mandatory_cov_pct / 100.0) < max(0.0, min(1.0, mandatory_min_coverage)):
@@ -56,18 +159,18 @@ def score_candidate(
                     "reason": "Mandatory coverage below threshold",
                     "threshold": mandatory_min_coverage,
                     "mandatory_coverage_pct": mandatory_cov_pct,
-                    "missing_mandatory": [m for m in mandatory if m.lower() not in cand_set],
-                    "matched_mandatory": [m for m in mandatory if m.lower() in cand_set],
+                    "missing_mandatory": [m for m, hit in zip(mandatory, mand_matched_mask) if not hit],
+                    "matched_mandatory": [m for m, hit in zip(mandatory, mand_matched_mask) if hit],
                 }
                 return 0.0, "Reject (insufficient mandatory coverage)", expl
 
     # --- Matches & counts ---
-    matched_req_set  = req_skills  & cand_set
-    matched_pref_set = pref_skills & cand_set
+    matched_req_set  = req_skills.intersection(cand_set)
+    matched_pref_set = pref_skills.intersection(cand_set)
     matched_all_set  = matched_req_set | matched_pref_set
 
     matched_count     = len(matched_all_set)
-    total_declared    = len(req_skills | pref_skills) or 1  # avoid div by zero
+    total_declared    = prepared["total_declared"]
     req_overlap_pct   = _pct(len(matched_req_set),  len(req_skills))  if req_skills  else 0.0
     pref_overlap_pct  = _pct(len(matched_pref_set), len(pref_skills)) if pref_skills else 0.0
     overall_overlap   = _pct(matched_count, total_declared)
@@ -75,11 +178,14 @@ def score_candidate(
     # --- Education & experience signals (small effect only) ---
     req_edu_list  = req.get("required_education", req_edu or [])
     cand_edu_list = cand_edu or []
+    req_edu_lower = prepared["req_edu_lower"]
+    if req_edu_lower is None:  # no job-level requirement: fall back to the per-call req_edu
+        req_edu_lower = {e.lower() for e in req_edu_list}
     edu_match = bool(
-        (not req_edu_list) or any(e.lower() in [c.lower() for c in cand_edu_list] for e in req_edu_list)
+        (not req_edu_list) or not req_edu_lower.isdisjoint(c.lower() for c in cand_edu_list)
     )
 
-    min_years = req.get("min_years_experience", None)
+    min_years = prepared["min_years"]
     exp_bonus = 0.0
     if min_years is None:
         exp_bonus = 0.0
@@ -95,33 +201,13 @@ def score_candidate(
 
     # --- Banded scoring per your rules ---
     # We compute a base score from the band and nudge it slightly by overlaps/bonuses.
-    if matched_count == 0:
-        base = 10.0 if overall_overlap > 0 else 0.0
-        decision = "Reject"
-    elif matched_count == 1:
-        base = 35.0   # still Reject by requirement
-        decision = "Reject"
-    elif matched_count == 2:
-        # 60–70: favor required matches within the band
-        if len(matched_req_set) == 2:
-            base = 70.0
-        elif len(matched_req_set) == 1:
-            base = 65.0
-        else:
-            base = 60.0
-        decision = "Accept"
-    elif matched_count == 3:
-        # 75–85: bias by how many are required
-        base = 75.0 + min(10.0, 3.0 * len(matched_req_set) + 2.0 * len(matched_pref_set))
-        base = min(base, 85.0)
-        decision = "Accept"
-    else:  # matched_count >= 4
-        # 90–100: ramp a little with extra matches, cap at 100
-        base = 90.0 + min(10.0, (matched_count - 4) * 2.5)  # 4→90, 5→92.5, 6→95, 7→97.5, 8+→100
-        # Tiny push if most of them are required
-        req_ratio = (len(matched_req_set) / matched_count) if matched_count else 0.0
-        base += 2.0 * req_ratio   # up to +2
-        decision = "Accept"
+    n_req = len(matched_req_set)
+    base = _BAND_TABLE.get((matched_count, n_req))
+    if base is None:
+        if matched_count == 3:
+            base = _band3(n_req, len(matched_pref_set))
+        else:  # matched_count >= 4
+            base = _band4plus(matched_count, n_req)
 
     # Small, capped adjustments so we stay in the intended band
     # (we apply a micro-overlap nudge and the edu/exp bonuses)
@@ -138,10 +224,11 @@ def score_candidate(
     expl = {
         "matched_count": matched_count,
         "total_declared_skills": total_declared,
-        "matched_required_skills": sorted({s for s in req_skills if s in matched_all_set}),
-        "matched_preferred_skills": sorted({s for s in pref_skills if s in matched_all_set}),
-        "missing_required_skills": sorted({s for s in req_skills if s not in matched_all_set}),
-        "missing_preferred_skills": sorted({s for s in pref_skills if s not in matched_all_set}),
+        # req ∩ (matched_req ∪ matched_pref) == matched_req, so reuse the intersections
+        "matched_required_skills": sorted(matched_req_set),
+        "matched_preferred_skills": sorted(matched_pref_set),
+        "missing_required_skills": sorted(req_skills - matched_all_set),
+        "missing_preferred_skills": sorted(pref_skills - matched_all_set),
         "mandatory_coverage_pct": mandatory_cov_pct,
         "required_overlap_pct": req_overlap_pct,
         "preferred_overlap_pct": pref_overlap_pct,